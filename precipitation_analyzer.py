@@ -1,140 +1,656 @@
-import pandas as pd
-import os
-import calendar # For leap year check
-
-def is_leap_year(year):
-    """Checks if a given year is a leap year."""
-    return calendar.isleap(year)
-
-def process_excel_files(input_folder, output_processed_folder, output_summary_folder):
-    """
-    Processes Excel and CSV files to calculate column averages and save results.
-
-    This enhanced function dynamically identifies the starting point of year data
-    by looking for "DAY" or "days" headers. It then processes subsequent columns
-    as years to calculate averages.
-
-    Args:
-        input_folder (str): Path to the folder containing original Excel/CSV files.
-        output_processed_folder (str): Path to the folder to save processed files.
-        output_summary_folder (str): Path to the folder to save the summary of averages.
-    """
-
-    # Create output directories if they don't exist
-    os.makedirs(output_processed_folder, exist_ok=True)
-    os.makedirs(output_summary_folder, exist_ok=True)
-
-    summary_data = [] # To store year and average for the summary file
-
-    for filename in os.listdir(input_folder):
-        # Check for both Excel and CSV file extensions
-        if filename.endswith(('.xlsx', '.xls', '.csv')):
-            filepath = os.path.join(input_folder, filename)
-            try:
-                # Read the file based on its extension
-                if filename.endswith(('.xlsx', '.xls')):
-                    df = pd.read_excel(filepath)
-                    print(f"Reading Excel file: {filename}")
-                elif filename.endswith('.csv'):
-                    df = pd.read_csv(filepath)
-                    print(f"Reading CSV file: {filename}")
-
-                # Initialize a list to hold the averages for the current file
-                current_file_averages = []
-                average_row_data = {} # To store averages for the new row
-
-                # Determine the starting index for year columns
-                # We'll look for 'DAY' or 'days' and start processing from the column after it.
-                start_col_index_for_years = -1 # Default to -1, meaning not found yet
-
-                for col_index, col_name in enumerate(df.columns):
-                    # Convert column name to lowercase for case-insensitive comparison
-                    lower_col_name = str(col_name).lower()
-                    if lower_col_name == 'day' or lower_col_name == 'days':
-                        start_col_index_for_years = col_index + 1 # Years start from the next column
-                        break # Found our marker, no need to check earlier columns
-
-                # If 'DAY' or 'days' marker was not found, assume years start from the 3rd column (index 2)
-                # as a fallback to the previous logic.
-                if start_col_index_for_years == -1:
-                    print(f"Warning: Neither 'DAY' nor 'days' header found in '{filename}'. Assuming year columns start from the 3rd column (index 2).")
-                    start_col_index_for_years = 2
-
-                # Iterate through columns from the determined starting index for years
-                for col_index, col_name in enumerate(df.columns):
-                    if col_index >= start_col_index_for_years:
-                        try:
-                            # Attempt to convert column name to an integer year.
-                            # If the column header is not a valid year, this will raise a ValueError,
-                            # and the column will be skipped.
-                            year = int(col_name)
-                            # Calculate the average of the numerical data in the column
-                            # .dropna() to ignore any non-numeric or empty cells
-                            column_data = pd.to_numeric(df[col_name], errors='coerce').dropna()
-                            if not column_data.empty:
-                                col_average = column_data.mean()
-                                current_file_averages.append({
-                                    'Year': year,
-                                    'Average': col_average,
-                                    'Leap Year': is_leap_year(year)
-                                })
-                                average_row_data[col_name] = col_average
-                            else:
-                                print(f"Warning: Column '{col_name}' in '{filename}' contains no valid numerical data. Skipping average calculation.")
-                                average_row_data[col_name] = None # Or some placeholder
-                        except ValueError:
-                            # This block handles cases where the column header is not a valid integer year.
-                            print(f"Warning: Column header '{col_name}' in '{filename}' is not a valid year. Skipping average calculation for this column.")
-                            average_row_data[col_name] = None # Or some placeholder
-                        except Exception as e:
-                            print(f"Error processing column '{col_name}' in '{filename}': {e}")
-                            average_row_data[col_name] = None # Or some placeholder
-                    else:
-                        # For columns before the year data starts, just add them to the average_row_data
-                        # with their original values or None if they are not relevant for averaging.
-                        # This ensures the new row aligns correctly.
-                        average_row_data[col_name] = None # Or df.iloc[-1][col_name] if you want to copy last row data
-
-                # Add a new row with averages to the DataFrame for the processed file
-                # Create a new DataFrame for the average row, aligning columns
-                average_df = pd.DataFrame([average_row_data], columns=df.columns)
-                df_with_average = pd.concat([df, average_df], ignore_index=True)
-
-                # Save the processed file (maintaining original extension for now, can be changed if needed)
-                output_filepath = os.path.join(output_processed_folder, filename)
-                if filename.endswith(('.xlsx', '.xls')):
-                    df_with_average.to_excel(output_filepath, index=False)
-                elif filename.endswith('.csv'):
-                    df_with_average.to_csv(output_filepath, index=False)
-                print(f"Processed '{filename}' and saved to '{output_filepath}'")
-
-                # Add data to the overall summary
-                for avg_info in current_file_averages:
-                    summary_data.append({
-                        'File': filename,
-                        'Year': avg_info['Year'],
-                        'Average Data': avg_info['Average'],
-                        'Is Leap Year': avg_info['Leap Year']
-                    })
-
-            except Exception as e:
-                print(f"Error processing file '{filename}': {e}")
-
-    # Save the consolidated summary of years and averages
-    if summary_data:
-        summary_df = pd.DataFrame(summary_data)
-        summary_output_filepath = os.path.join(output_summary_folder, 'all_files_years_and_averages.csv')
-        summary_df.to_csv(summary_output_filepath, index=False)
-        print(f"\nSummary of years and averages saved to '{summary_output_filepath}'")
-    else:
-        print("\nNo data processed to create a summary file.")
-
-# --- How to use the code ---
-if __name__ == "__main__":
-    # IMPORTANT: Replace this with the actual path to your input folder
-    input_folder_path = r"C:\Users\aaa\Desktop\all 30s"
-    output_processed_folder_path = os.path.join(input_folder_path, "processed_excel_files")
-    output_summary_folder_path = os.path.join(input_folder_path, "summary_averages")
-
-    process_excel_files(input_folder_path, output_processed_folder_path, output_summary_folder_path)
-    print("\nScript execution completed. Check the specified output folders.")
+import pandas as pd
+import numpy as np
+import os
+import calendar # For leap year check
+import csv
+import io
+import json
+import shutil
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+
+# Prefer the Rust-based calamine engine for reading Excel files; it is much
+# faster than the default openpyxl engine. Fall back to the pandas default
+# if python-calamine is not installed.
+try:
+    import python_calamine # noqa: F401 (only imported to detect availability)
+    EXCEL_READ_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_READ_ENGINE = None # pandas picks its default engine
+
+# Parquet caching of Excel reads needs a parquet engine (pyarrow); if none is
+# installed the cache is simply skipped and Excel files are re-parsed each run.
+try:
+    import pyarrow # noqa: F401 (only imported to detect availability)
+    PARQUET_CACHE_AVAILABLE = True
+    # pyarrow's multi-threaded CSV parser is also the fastest read_csv engine.
+    CSV_READ_ENGINE = 'pyarrow'
+except ImportError:
+    PARQUET_CACHE_AVAILABLE = False
+    CSV_READ_ENGINE = None # pandas picks its default engine
+
+# xlsxwriter is a faster single-pass writer than the default openpyxl.
+try:
+    import xlsxwriter # noqa: F401 (only imported to detect availability)
+    EXCEL_WRITE_ENGINE = 'xlsxwriter'
+except ImportError:
+    EXCEL_WRITE_ENGINE = None # pandas picks its default engine
+
+# openpyxl lets us append the averages row to a copied workbook instead of
+# rewriting the whole sheet through pandas.
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# With numba installed, the per-column nanmean reduction is JIT-compiled into
+# a single parallel pass over the block instead of going through np.nanmean.
+try:
+    from numba import njit, prange
+
+    @njit(parallel=True, cache=True)
+    def _col_nanmean(a):
+        """Per-column mean of a 2-D float array, ignoring NaN cells."""
+        n, m = a.shape
+        out = np.empty(m, np.float64)
+        for j in prange(m):
+            s = 0.0
+            c = 0
+            for i in range(n):
+                v = a[i, j]
+                if v == v: # not NaN
+                    s += v
+                    c += 1
+            out[j] = s / c if c else np.nan
+        return out
+except ImportError:
+    _col_nanmean = None
+
+# polars can lazily scan a CSV and average the year columns in one Rust
+# query plan without ever materializing the rows in Python.
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+# numexpr computes reductions on cache-sized chunks across threads; worth it
+# once a file's year block is large enough to be memory-bandwidth-bound.
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+# Smallest number of cells in a year block before numexpr pays for itself.
+_NUMEXPR_MIN_SIZE = 100_000
+
+def _block_means(arr):
+    """
+    Per-column mean of a 2-D float64 block, ignoring NaNs.
+
+    Picks the fastest available backend: the numba kernel when compiled,
+    numexpr's threaded reduction for large blocks, and np.nanmean otherwise.
+    All-NaN columns yield NaN in every backend.
+
+    Args:
+        arr (np.ndarray): Array of shape (rows, year columns).
+
+    Returns:
+        np.ndarray: One mean per column.
+    """
+    if _col_nanmean is not None:
+        # One JIT-compiled parallel pass over the whole block.
+        return _col_nanmean(arr)
+    if numexpr is not None and arr.size >= _NUMEXPR_MIN_SIZE:
+        # Sum values and counts with NaN masked to zero, in threaded
+        # cache-blocked chunks; 0/0 for all-NaN columns gives NaN.
+        sums = numexpr.evaluate('sum(where(a != a, 0.0, a), axis=0)', local_dict={'a': arr})
+        counts = numexpr.evaluate('sum(where(a != a, 0.0, 1.0), axis=0)', local_dict={'a': arr})
+        with np.errstate(invalid='ignore'):
+            return sums / counts
+    with warnings.catch_warnings():
+        # All-NaN columns produce NaN plus a RuntimeWarning; callers handle
+        # the NaN, so silence the warning here.
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        return np.nanmean(arr, axis=0)
+
+@lru_cache(maxsize=None)
+def is_leap_year(year):
+    """Checks if a given year is a leap year.
+
+    The same handful of years repeats across every file, so the result is
+    cached and each year is only ever computed once per process.
+    """
+    return calendar.isleap(year)
+
+def _find_year_start(columns, filename, warn=True):
+    """
+    Finds the column index where the year data starts.
+
+    Looks for a 'DAY' or 'days' header (case-insensitive) and returns the
+    index of the column after it; falls back to index 2 if no marker exists.
+
+    Args:
+        columns: Sequence of column headers.
+        filename (str): Name of the file, used in warning messages.
+        warn (bool): Whether to print a warning when no marker is found
+            (disabled for the header-only probe so it is not printed twice).
+
+    Returns:
+        int: Index of the first year column.
+    """
+    # One vectorized scan over the header instead of a Python loop:
+    # lowercase every header and test membership in a single C pass.
+    mask = pd.Index(columns).astype(str).str.lower().isin(('day', 'days'))
+    if mask.any():
+        return int(mask.argmax()) + 1 # Years start after the marker column
+
+    # If 'DAY' or 'days' marker was not found, assume years start from the 3rd column (index 2)
+    # as a fallback to the previous logic.
+    if warn:
+        print(f"Warning: Neither 'DAY' nor 'days' header found in '{filename}'. Assuming year columns start from the 3rd column (index 2).")
+    return 2
+
+def _usecols_for(columns, filename):
+    """
+    Picks the column positions worth parsing: everything before the year
+    section (kept so the processed output stays aligned) plus the columns
+    whose header is a valid integer year.
+
+    Returns None when nothing can be dropped, so callers can skip the
+    usecols machinery entirely.
+
+    Args:
+        columns: Sequence of column headers from a header-only read.
+        filename (str): Name of the file, used in warning messages.
+
+    Returns:
+        list[int] | None: Column positions to read, or None to read all.
+    """
+    # The index-2 fallback can exceed a narrow header; clamp it so the
+    # positions stay in bounds (a file with no year section keeps all
+    # columns and is handled by the no-year-columns path downstream).
+    start = min(_find_year_start(columns, filename, warn=False), len(columns))
+    is_year = _year_mask(columns[start:])
+    keep = list(range(start)) + [start + i for i, ok in enumerate(is_year) if ok]
+    if len(keep) == len(columns):
+        return None
+    return keep
+
+def _read_file_bytes(path):
+    """Reads a file's raw bytes; used by the IO prefetch thread pool."""
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _append_csv_row(path, values):
+    """
+    Appends one row of values to an existing CSV file.
+
+    Args:
+        path (str): Path of the CSV file to append to.
+        values: Sequence of cell values; None becomes an empty cell.
+    """
+    with open(path, 'a+', newline='') as f:
+        # Make sure the appended row starts on its own line even if the
+        # copied file does not end with a newline.
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(f.tell() - 1)
+            if f.read(1) != '\n':
+                f.write('\n')
+        f.write(','.join('' if v is None else str(float(v)) for v in values) + '\n')
+
+def _year_mask(columns):
+    """
+    Marks which headers are valid integer years, in one vectorized regex
+    pass instead of a per-column int() / ValueError dance.
+
+    Args:
+        columns: Sequence of column headers.
+
+    Returns:
+        np.ndarray: Boolean mask, True where the header is an integer year.
+    """
+    return np.asarray(pd.Index(columns).astype(str).str.fullmatch(r'-?\d+'), dtype=bool)
+
+def _year_dtype_map(columns):
+    """
+    Builds a dtype mapping that makes the parser convert year columns to
+    float32 directly, instead of a separate to_numeric pass afterwards.
+
+    Args:
+        columns: Sequence of column headers.
+
+    Returns:
+        dict: Mapping of year-column header -> np.float32.
+    """
+    is_year = _year_mask(columns)
+    return {col_name: np.float32 for col_name, ok in zip(columns, is_year) if ok}
+
+def _read_excel_cached(filepath, filename, cache_dir, data=None):
+    """
+    Reads an Excel file, using a Parquet cache to skip re-parsing on reruns.
+
+    Excel is by far the slowest format to parse, so the first read of each
+    file writes a sibling .parquet copy into cache_dir; later runs load that
+    instead, as long as it is not older than the input file.
+
+    Args:
+        filepath (str): Full path to the input Excel file.
+        filename (str): Base name of the input file (used for the cache name).
+        cache_dir (str): Folder holding the .parquet cache copies, or None to
+            disable caching.
+        data (bytes): Prefetched raw file contents, or None to read from
+            filepath directly.
+
+    Returns:
+        pandas.DataFrame: The file contents.
+    """
+    if cache_dir is not None and PARQUET_CACHE_AVAILABLE:
+        cache_path = os.path.join(cache_dir, filename + '.parquet')
+        try:
+            if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(filepath):
+                return pd.read_parquet(cache_path)
+        except Exception as e:
+            print(f"Warning: Could not read cache for '{filename}' ({e}). Re-reading the Excel file.")
+
+    # Parse from the prefetched bytes when available, rewinding the buffer
+    # between the probe and the real read.
+    source = io.BytesIO(data) if data is not None else filepath
+
+    # Probe just the header row first, then parse only the day/year columns;
+    # auxiliary columns after the marker are never worth the parsing cost.
+    header = pd.read_excel(source, nrows=0, engine=EXCEL_READ_ENGINE).columns
+    usecols = _usecols_for(header, filename)
+    if data is not None:
+        source.seek(0)
+    try:
+        # Let the parser convert year columns to float32 in one go.
+        df = pd.read_excel(source, engine=EXCEL_READ_ENGINE, usecols=usecols,
+                           dtype=_year_dtype_map(header))
+    except (ValueError, TypeError):
+        # A year column holds something non-numeric; fall back to an
+        # untyped read and let the coercion in the averaging step handle it.
+        if data is not None:
+            source.seek(0)
+        df = pd.read_excel(source, engine=EXCEL_READ_ENGINE, usecols=usecols)
+
+    if cache_dir is not None and PARQUET_CACHE_AVAILABLE:
+        try:
+            # Parquet requires string column names; year headers are often
+            # ints, so rename them for the cached copy only. Downstream code
+            # parses the headers back to ints either way.
+            df.rename(columns=str).to_parquet(cache_path)
+        except Exception as e:
+            print(f"Warning: Could not write cache for '{filename}': {e}")
+
+    return df
+
+def _read_csv_pandas(source, usecols, header, data):
+    """
+    Reads a CSV through pandas, trying the dtyped float32 read first.
+
+    Args:
+        source: File path or rewindable BytesIO of prefetched bytes.
+        usecols: Column names to parse, or None for all.
+        header: Full header from the probe read, for the dtype map.
+        data (bytes): Prefetched raw contents, or None when reading a path.
+
+    Returns:
+        pandas.DataFrame: The parsed columns.
+    """
+    try:
+        # Let the multi-threaded parser convert year columns to float32
+        # in one go.
+        return pd.read_csv(source, usecols=usecols,
+                           dtype=_year_dtype_map(header),
+                           engine=CSV_READ_ENGINE)
+    except (ValueError, TypeError):
+        # A year column holds something non-numeric; fall back to an untyped
+        # read and let the coercion in the averaging step handle it.
+        if data is not None:
+            source.seek(0)
+        return pd.read_csv(source, usecols=usecols, engine=CSV_READ_ENGINE)
+
+def _process_one(filepath, output_processed_folder, cache_dir=None, write_processed=False,
+                 data=None):
+    """
+    Processes a single Excel/CSV file: reads it, averages the year columns,
+    writes the processed copy, and returns the summary rows for that file.
+
+    This is a module-level function so it can be dispatched to worker
+    processes by process_excel_files.
+
+    Args:
+        filepath (str): Full path to the input Excel/CSV file.
+        output_processed_folder (str): Path to the folder to save the processed file.
+        cache_dir (str): Folder for Parquet cache copies of Excel inputs,
+            or None to disable caching.
+        write_processed (bool): Whether to write the full per-file copy with
+            the averages row appended. Off by default, since that doubles
+            every input on disk just to add one row; the averages themselves
+            always end up in the summary outputs.
+        data (bytes): Raw file contents prefetched by the IO thread pool, or
+            None to read from disk here.
+
+    Returns:
+        list[tuple] | None: One (file, year, average, leap) tuple per year
+            column, ready for the summary CSV, or None if the file failed
+            to process.
+    """
+    filename = os.path.basename(filepath)
+    summary_rows = []
+    lazy_frame = None # Polars lazy plan for CSVs; pandas paths leave it None
+    try:
+        # Read the file based on its extension
+        if filename.endswith(('.xlsx', '.xls')):
+            df = _read_excel_cached(filepath, filename, cache_dir, data=data)
+            columns = df.columns
+            print(f"Reading Excel file: {filename}")
+        elif filename.endswith('.csv'):
+            # Same header-probe trick as for Excel: only parse the columns
+            # that will actually be used. Prefetched bytes are parsed through
+            # a rewindable BytesIO instead of re-reading the file.
+            source = io.BytesIO(data) if data is not None else filepath
+            # The header probe keeps the default engine (pyarrow has no nrows).
+            header = pd.read_csv(source, nrows=0).columns
+            if data is not None:
+                source.seek(0)
+            usecols = _usecols_for(header, filename)
+            if usecols is not None:
+                # The pyarrow engine wants column names, not positions; CSV
+                # headers are always strings, so map positions to names.
+                usecols = [header[i] for i in usecols]
+            if pl is not None:
+                # With polars available, just build the lazy scan here; the
+                # cast-and-mean query runs in one Rust plan once the year
+                # columns are known, and the rows never reach Python.
+                lazy_frame = pl.scan_csv(source)
+                df = None
+                columns = pd.Index(usecols) if usecols is not None else header
+                print(f"Reading CSV file: {filename}")
+            else:
+                df = _read_csv_pandas(source, usecols, header, data)
+                columns = df.columns
+                print(f"Reading CSV file: {filename}")
+
+        # Initialize a list to hold the averages for the current file
+        current_file_averages = []
+        average_row_data = {} # To store averages for the new row
+
+        # Determine the starting index for year columns
+        # ('DAY'/'days' marker, with a fallback to index 2).
+        start_col_index_for_years = _find_year_start(columns, filename)
+
+        # Sort the columns from the determined starting index into year columns
+        # (headers that parse as an integer year) and everything else, using
+        # one vectorized regex pass instead of int()/ValueError per column.
+        tail = columns[start_col_index_for_years:]
+        is_year = _year_mask(tail)
+        year_cols = list(tail[is_year])
+        years = [int(col_name) for col_name in year_cols]
+
+        # Columns before the year data start stay in average_row_data as None
+        # placeholders so the appended row aligns correctly.
+        for col_name in columns[:start_col_index_for_years]:
+            average_row_data[col_name] = None
+        for col_name in tail[~is_year]:
+            print(f"Warning: Column header '{col_name}' in '{filename}' is not a valid year. Skipping average calculation for this column.")
+            average_row_data[col_name] = None # Or some placeholder
+
+        # Average every year column in one vectorized pass instead of a
+        # Python-level loop per column. The block is converted to a plain
+        # float64 ndarray once so the reduction runs as a single NumPy
+        # C loop; np.nanmean skips NaN the same way .dropna().mean() did.
+        if year_cols:
+            if lazy_frame is not None:
+                # Collect the whole cast-and-mean query in one Rust plan;
+                # junk cells become null (strict=False) and nulls are skipped
+                # by mean(), matching the NaN handling of the numeric paths.
+                result = lazy_frame.select(
+                    [pl.col(str(col_name)).cast(pl.Float64, strict=False).mean()
+                     for col_name in year_cols]).collect()
+                means = np.array([np.nan if v is None else v for v in result.row(0)])
+            else:
+                try:
+                    # Year columns are normally already float32 from the
+                    # dtyped read, so this is a plain (and cheap) cast.
+                    arr = df[year_cols].to_numpy(dtype=np.float64)
+                except (ValueError, TypeError):
+                    # Fallback read left object columns behind; coerce them now.
+                    arr = df[year_cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+                means = _block_means(arr)
+            # Leap years for the whole file in one vectorized boolean
+            # expression rather than a per-year Python call.
+            years_arr = np.asarray(years, dtype=np.int64)
+            leap_mask = (years_arr % 4 == 0) & ((years_arr % 100 != 0) | (years_arr % 400 == 0))
+            for col_name, year, col_average, leap in zip(year_cols, years, means, leap_mask):
+                if pd.notna(col_average):
+                    current_file_averages.append({
+                        'Year': year,
+                        'Average': col_average,
+                        'Leap Year': bool(leap)
+                    })
+                    average_row_data[col_name] = col_average
+                else:
+                    print(f"Warning: Column '{col_name}' in '{filename}' contains no valid numerical data. Skipping average calculation.")
+                    average_row_data[col_name] = None # Or some placeholder
+
+        # Optionally save the processed file: copy the input as-is and append
+        # just the averages row, instead of re-serializing the whole
+        # DataFrame. The lookup is keyed by stringified header so it works
+        # whether column labels came through as ints or strings.
+        if not write_processed:
+            print(f"Computed averages for '{filename}'")
+        else:
+            output_filepath = os.path.join(output_processed_folder, filename)
+            avg_by_name = {str(col_name): value for col_name, value in average_row_data.items()}
+            if filename.endswith('.csv'):
+                if data is not None:
+                    # Reuse the prefetched bytes rather than reading the
+                    # input a second time just to copy it.
+                    with open(output_filepath, 'wb') as out:
+                        out.write(data)
+                else:
+                    shutil.copyfile(filepath, output_filepath)
+                _append_csv_row(output_filepath, [avg_by_name.get(str(col_name)) for col_name in header])
+            elif filename.endswith('.xlsx') and openpyxl is not None:
+                # data_only=True loads the cached computed values for formula
+                # cells; without it, saving writes formulas with no cached
+                # result and the processed copy's formula columns read back
+                # as NaN. This matches the values pandas saw when averaging.
+                wb = openpyxl.load_workbook(io.BytesIO(data) if data is not None else filepath,
+                                            data_only=True)
+                ws = wb.active
+                header_cells = next(ws.iter_rows(min_row=1, max_row=1, values_only=True))
+                ws.append([None if avg_by_name.get(str(col_name)) is None
+                           else float(avg_by_name[str(col_name)])
+                           for col_name in header_cells])
+                wb.save(output_filepath)
+            else:
+                # .xls (or no openpyxl): fall back to appending the row to a
+                # DataFrame and rewriting the file through pandas. Re-read
+                # the full sheet here — df was narrowed by usecols, and the
+                # written copy must keep the auxiliary columns too.
+                full_df = pd.read_excel(io.BytesIO(data) if data is not None else filepath,
+                                        engine=EXCEL_READ_ENGINE)
+                full_df.loc[len(full_df)] = [avg_by_name.get(str(col_name))
+                                             for col_name in full_df.columns]
+                full_df.to_excel(output_filepath, index=False, engine=EXCEL_WRITE_ENGINE)
+            print(f"Processed '{filename}' and saved to '{output_filepath}'")
+
+        # Collect this file's data for the overall summary as plain tuples;
+        # the parent process streams them straight into the summary CSV.
+        for avg_info in current_file_averages:
+            summary_rows.append((filename, avg_info['Year'], avg_info['Average'], avg_info['Leap Year']))
+
+    except Exception as e:
+        print(f"Error processing file '{filename}': {e}")
+        # None tells the parent this file failed (as opposed to legitimately
+        # having no year data), so the failure is never memoized.
+        return None
+
+    return summary_rows
+
+def process_excel_files(input_folder, output_processed_folder, output_summary_folder,
+                        write_processed=False):
+    """
+    Processes Excel and CSV files to calculate column averages and save results.
+
+    This enhanced function dynamically identifies the starting point of year data
+    by looking for "DAY" or "days" headers. It then processes subsequent columns
+    as years to calculate averages.
+
+    Each file is independent (read -> compute -> write), so the per-file work
+    is fanned out to a pool of worker processes, one per CPU core.
+
+    Args:
+        input_folder (str): Path to the folder containing original Excel/CSV files.
+        output_processed_folder (str): Path to the folder to save processed files.
+        output_summary_folder (str): Path to the folder to save the summary of averages.
+        write_processed (bool): Whether to write a full copy of every input
+            with the averages row appended. By default only an
+            'averages_only.csv' (one row of averages per input file) is
+            written to the processed folder, which avoids duplicating every
+            input on disk; pass True to restore the old per-file copies.
+    """
+
+    # Create output directories if they don't exist
+    os.makedirs(output_processed_folder, exist_ok=True)
+    os.makedirs(output_summary_folder, exist_ok=True)
+
+    # Parquet cache for Excel inputs, kept next to the data so reruns on the
+    # same folder skip the slow Excel parse entirely.
+    cache_dir = None
+    if PARQUET_CACHE_AVAILABLE:
+        cache_dir = os.path.join(input_folder, '.parquet_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # Collect the files to process up front so they can be dispatched to
+    # workers. os.scandir gives DirEntry objects with the full path, file
+    # type, and stat result cached, avoiding a join and extra stat call per
+    # entry; mtime and size double as the memoization key below.
+    filepaths = []
+    file_stats = {}
+    with os.scandir(input_folder) as entries:
+        for entry in entries:
+            # Check for both Excel and CSV file extensions
+            if entry.is_file() and entry.name.endswith(('.xlsx', '.xls', '.csv')):
+                filepaths.append(entry.path)
+                stat = entry.stat()
+                file_stats[entry.path] = (stat.st_mtime, stat.st_size)
+
+    # Memoized per-file results from earlier runs, keyed by (path, mtime,
+    # size), so a rerun only recomputes the files that actually changed.
+    # Skipped in write_processed mode, where every file must be re-read to
+    # produce its processed copy.
+    results_cache_path = os.path.join(input_folder, '.averages_cache.json')
+    results_cache = {}
+    if not write_processed:
+        try:
+            with open(results_cache_path) as cache_file:
+                results_cache = json.load(cache_file)
+        except (OSError, ValueError):
+            results_cache = {} # Missing or corrupt cache; start fresh
+
+    def _cached_rows(path):
+        entry = results_cache.get(path)
+        mtime, size = file_stats[path]
+        if entry is not None and entry['mtime'] == mtime and entry['size'] == size:
+            return entry['rows']
+        return None
+
+    # Stream the consolidated summary straight to disk as results come in,
+    # instead of accumulating every row in memory and building a DataFrame.
+    summary_output_filepath = os.path.join(output_summary_folder, 'all_files_years_and_averages.csv')
+    rows_written = 0
+    averages_only_file = None
+    if not write_processed:
+        # One compact row of averages per input file, instead of duplicating
+        # every input just to append that row. No header, because the number
+        # of year columns differs per file.
+        averages_only_path = os.path.join(output_processed_folder, 'averages_only.csv')
+        averages_only_file = open(averages_only_path, 'w', newline='')
+        averages_only_writer = csv.writer(averages_only_file)
+    try:
+        with open(summary_output_filepath, 'w', newline='') as summary_file:
+            summary_writer = csv.writer(summary_file)
+            summary_writer.writerow(['File', 'Year', 'Average Data', 'Is Leap Year'])
+
+            # Process the changed files in parallel. A small thread pool
+            # prefetches raw bytes (pandas releases the GIL during file IO,
+            # so reads overlap — important on network-mounted folders) and
+            # hands them to the process pool for the CPU-bound parsing and
+            # averaging. Unchanged files come straight from the memoization
+            # cache; results are written in the original (directory) order.
+            to_process = [filepath for filepath in filepaths
+                          if write_processed or _cached_rows(filepath) is None]
+            futures = {}
+            if to_process:
+                worker = partial(_process_one, output_processed_folder=output_processed_folder,
+                                 cache_dir=cache_dir, write_processed=write_processed)
+                io_pool = ThreadPoolExecutor(max_workers=8)
+                executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+                futures = {filepath: executor.submit(worker, filepath, data=data)
+                           for filepath, data in zip(to_process,
+                                                     io_pool.map(_read_file_bytes, to_process))}
+            try:
+                for filepath in filepaths:
+                    if filepath in futures:
+                        file_rows = futures[filepath].result()
+                        if file_rows is None:
+                            # The file failed to process; leave it out of the
+                            # cache so the next run retries it and the error
+                            # stays visible instead of being memoized away.
+                            continue
+                        mtime, size = file_stats[filepath]
+                        results_cache[filepath] = {
+                            'mtime': mtime,
+                            'size': size,
+                            # Plain Python types so the cache serializes to JSON
+                            'rows': [[row[0], int(row[1]), float(row[2]), bool(row[3])]
+                                     for row in file_rows],
+                        }
+                    else:
+                        file_rows = _cached_rows(filepath)
+                        print(f"Using cached averages for '{os.path.basename(filepath)}'")
+                    summary_writer.writerows(file_rows)
+                    rows_written += len(file_rows)
+                    if averages_only_file is not None and file_rows:
+                        averages_only_writer.writerow(
+                            [file_rows[0][0]] + [row[2] for row in file_rows])
+            finally:
+                if to_process:
+                    io_pool.shutdown()
+                    executor.shutdown()
+    finally:
+        if averages_only_file is not None:
+            averages_only_file.close()
+
+    # Persist the memoization cache so the next run skips unchanged files.
+    if not write_processed:
+        try:
+            with open(results_cache_path, 'w') as cache_file:
+                json.dump(results_cache, cache_file)
+        except OSError as e:
+            print(f"Warning: Could not write results cache: {e}")
+
+    if rows_written:
+        print(f"\nSummary of years and averages saved to '{summary_output_filepath}'")
+    else:
+        # Keep the old behaviour of not leaving output files behind when
+        # nothing was processed.
+        os.remove(summary_output_filepath)
+        if averages_only_file is not None:
+            os.remove(averages_only_path)
+        print("\nNo data processed to create a summary file.")
+
+# --- How to use the code ---
+if __name__ == "__main__":
+    # IMPORTANT: Replace this with the actual path to your input folder
+    input_folder_path = r"C:\Users\aaa\Desktop\all 30s"
+    output_processed_folder_path = os.path.join(input_folder_path, "processed_excel_files")
+    output_summary_folder_path = os.path.join(input_folder_path, "summary_averages")
+
+    process_excel_files(input_folder_path, output_processed_folder_path, output_summary_folder_path)
+    print("\nScript execution completed. Check the specified output folders.")